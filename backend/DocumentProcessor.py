@@ -1,21 +1,59 @@
+import os
+import tempfile
 import fitz
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
 from PIL import Image
 import pytesseract
+
+try:
+    from tesserocr import PyTessBaseAPI, PSM
+except ImportError:
+    # tesserocr needs libtesseract headers to build; fall back to the pytesseract CLI wrapper
+    PyTessBaseAPI = None
 from typing import List, Dict, Any
 from datetime import datetime
 
+# Plain text extraction: keep whitespace, expand ligatures, clip to the visible page
+TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+
+# Below this page count a process pool costs more to start than it saves
+PARALLEL_PAGE_THRESHOLD = 16
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> str:
+    """Extract text from pages [start, stop) in a worker process"""
+    with fitz.open(file_path) as doc:
+        return "".join(doc.load_page(i).get_text("text", flags=TEXT_FLAGS) for i in range(start, stop))
+
 class DocumentProcessor:
     """Handles PDF, image, and text document processing"""
 
+    def __init__(self):
+        # One long-lived Tesseract engine instead of a tesseract subprocess per image
+        self._tess = None
+        self._tess_lock = Lock()  # a single API handle is not thread-safe
+        if PyTessBaseAPI is not None:
+            try:
+                self._tess = PyTessBaseAPI(lang="eng", psm=PSM.AUTO)
+            except RuntimeError as e:
+                logging.error(f"Tesseract API initialization error: {e}")
+
     def extract_text_from_pdf(self, file_path: str) -> str:
         """Extract text from PDF files"""
         try:
-            doc = fitz.open(file_path)
-            text = ""
-            for page in doc:
-                text += page.get_text()
-            return text.strip()
+            with fitz.open(file_path) as doc:
+                page_count = doc.page_count
+                if page_count <= PARALLEL_PAGE_THRESHOLD:
+                    return "".join(page.get_text("text", flags=TEXT_FLAGS) for page in doc).strip()
+
+            # Large documents: each worker re-opens the file and extracts one contiguous slice
+            workers = min(os.cpu_count() or 1, page_count)
+            chunk_size = -(-page_count // workers)
+            ranges = [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_extract_page_range, file_path, start, stop) for start, stop in ranges]
+                return "".join(future.result() for future in futures).strip()
         except Exception as e:
             logging.error(f"PDF extraction error: {e}")
             return ""
@@ -24,11 +62,34 @@ class DocumentProcessor:
         """Extract text from images using OCR"""
         try:
             image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
+            if self._tess is not None:
+                with self._tess_lock:
+                    self._tess.SetImage(image)
+                    text = self._tess.GetUTF8Text()
+            else:
+                text = pytesseract.image_to_string(image)
             return text.strip()
         except Exception as e:
             logging.error(f"OCR extraction error: {e}")
             return ""
 
-
-        return processed_docs
\ No newline at end of file
+    def extract_text_from_images(self, file_paths: List[str]) -> List[str]:
+        """Extract text from several images with a single Tesseract invocation"""
+        if not file_paths:
+            return []
+        list_path = None
+        try:
+            # Tesseract treats a .txt input as a list of images, so it only initializes once
+            with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as list_file:
+                list_file.writelines(os.path.abspath(path) + "\n" for path in file_paths)
+                list_path = list_file.name
+            text = pytesseract.image_to_string(list_path, config="--psm 6")
+            # Each image's output is terminated by a form feed
+            pages = [page.strip() for page in text.split("\f")]
+            return (pages + [""] * len(file_paths))[:len(file_paths)]
+        except Exception as e:
+            logging.error(f"Batch OCR extraction error: {e}")
+            return [""] * len(file_paths)
+        finally:
+            if list_path:
+                os.remove(list_path)
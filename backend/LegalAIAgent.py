@@ -1,29 +1,56 @@
-import json
+import asyncio
+import contextvars
+import orjson
+from bisect import bisect_right
 from collections import deque
+from itertools import islice
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 import logging
-from services.Client import get_client
+from datetime import datetime
+from typing import Optional
+from pymongo import MongoClient
+from services.Client import get_client, get_async_client
 from WebSearchAgent import WebSearchAgent
-from VectorStore import VectorStore
-from system_prompts import LEGAL_AI_SYSTEM_PROMPT
+from VectorStore import get_vector_store
+from system_prompts import render_system_prompt
+
+# Actions recorded by the agent run in the current context, so concurrent requests each see their own
+_run_actions: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("agent_run_actions", default=None)
 
 class LegalAIAgent:
     """🤖 AGENT-BASED TOOL ORCHESTRATION - LLM decides which tools to call"""
 
-    def __init__(self, search_api_key: str, mongo_connection_string: str):
+    __slots__ = (
+        "aiml_client", "async_aiml_client", "web_search", "vector_store", "conversation_history",
+        "primary_model", "fallback_model", "available_tools", "_tools_definition",
+        "_action_ids", "_action_names", "_action_descriptions", "_action_timestamps",
+        "_last_action_id", "_actions_lock", "_actions_event", "_actions_loop",
+    )
+
+    # Configuration
+    MAX_ITERATIONS = 3
+    MAX_HISTORY_PAIRS = 4
+    MAX_TOOL_SUMMARY_CHARS = 1000  # per stale tool result kept in the summary
+    MAX_AGENT_ACTIONS = 256  # oldest actions are dropped past this
+
+    # Shared by reference in every request; never mutated
+    _SYSTEM_MESSAGE = {"role": "system", "content": render_system_prompt()}
+
+    def __init__(self, search_api_key: str, mongo_connection_string: str, mongo_client: Optional[MongoClient] = None):
         # Initialize LLM client using centralized client
         self.aiml_client = get_client()
+        self.async_aiml_client = get_async_client()
 
         # Initialize tools
         self.web_search = WebSearchAgent(search_api_key)
-        self.vector_store = VectorStore(mongo_connection_string)
+        # Reuse the caller's client when given, so the process keeps a single Mongo pool
+        self.vector_store = get_vector_store(mongo_connection_string, client=mongo_client)
 
         # Initialize conversation history (keep last 4 exchanges)
         self.conversation_history = deque(maxlen=8)  # 8 messages = 4 user/assistant pairs
 
-        # Configuration
-        self.MAX_ITERATIONS = 3
-        self.MAX_HISTORY_PAIRS = 4
-        
         # Model configuration with fallback
         self.primary_model = "gpt-5-2025-08-07"  # Use the correct GPT-5 model
         self.fallback_model = "gpt-4o-mini"  # Fallback model
@@ -32,6 +59,7 @@ class LegalAIAgent:
         self.available_tools = {
             "search_recent_laws": {
                 "function": self._search_recent_laws_wrapper,
+                "async_function": self._search_recent_laws_async_wrapper,
                 "description": "Search for recent legal updates, new laws, and policy changes",
                 "parameters": {
                     "type": "object",
@@ -44,6 +72,7 @@ class LegalAIAgent:
             },
             "search_country_context": {
                 "function": self._search_country_context_wrapper,
+                "async_function": self._search_country_context_async_wrapper,
                 "description": "Search country-specific legal context and established laws from knowledge base",
                 "parameters": {
                     "type": "object",
@@ -56,93 +85,304 @@ class LegalAIAgent:
             }
         }
 
-        # Track agent actions
-        self.agent_actions = []
+        # Tool definitions advertised to the model, built once
+        self._tools_definition = [
+            {
+                "type": "function",
+                "function": {
+                    "name": name,
+                    "description": tool["description"],
+                    "parameters": tool["parameters"]
+                }
+            } for name, tool in self.available_tools.items()
+        ]
+
+        # Track agent actions as bounded parallel columns (id, name, description, timestamp).
+        # Ids increase monotonically, even across clears, so they work as client cursors.
+        self._action_ids = deque(maxlen=self.MAX_AGENT_ACTIONS)
+        self._action_names = deque(maxlen=self.MAX_AGENT_ACTIONS)
+        self._action_descriptions = deque(maxlen=self.MAX_AGENT_ACTIONS)
+        self._action_timestamps = deque(maxlen=self.MAX_AGENT_ACTIONS)
+        self._last_action_id = 0
+        self._actions_lock = Lock()  # tools record actions from worker threads
+
+        # Wakes SSE subscribers when an action is recorded; replaced after every wake-up
+        self._actions_event = asyncio.Event()
+        self._actions_loop = None
 
     def _add_agent_action(self, action: str, description: str):
         """Track agent actions with timestamp"""
-        import datetime
-        timestamp = datetime.datetime.now().isoformat()
-        self.agent_actions.append({
-            "action": action,
-            "description": description,
-            "timestamp": timestamp
-        })
+        timestamp = datetime.now().isoformat()
+        with self._actions_lock:
+            self._last_action_id += 1
+            action_id = self._last_action_id
+            self._action_ids.append(action_id)
+            self._action_names.append(action)
+            self._action_descriptions.append(description)
+            self._action_timestamps.append(timestamp)
+        run_actions = _run_actions.get()
+        if run_actions is not None:
+            run_actions.append({"id": action_id, "action": action, "description": description, "timestamp": timestamp})
+        self._notify_action_waiters()
+
+    def _notify_action_waiters(self):
+        """Signal waiting subscribers; safe to call from tool worker threads"""
+        loop = self._actions_loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake_action_waiters)
+
+    def _wake_action_waiters(self):
+        self._actions_event.set()
+        self._actions_event = asyncio.Event()
+
+    async def wait_for_actions(self, since: int = 0, timeout: float = None) -> bool:
+        """Wait until an action newer than the `since` id is recorded; False if the timeout passed first"""
+        self._actions_loop = asyncio.get_running_loop()
+        event = self._actions_event
+        # An action recorded since the caller last fetched would never wake this event
+        with self._actions_lock:
+            if self._action_ids and self._action_ids[-1] > since:
+                return True
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
 
     def _search_recent_laws_wrapper(self, query: str, jurisdiction: str = None) -> str:
         """Wrapper for web search tool"""
         self._add_agent_action("web_search", f"Searching web for '{query}' in {jurisdiction or 'global'}")
         print(f"🔍 Agent executing: Web search for '{query}' in {jurisdiction or 'global'}")
         results = self.web_search.search_recent_laws(query, jurisdiction)
-        return json.dumps(results, indent=2)
+        return orjson.dumps(results, default=str).decode()
+
+    async def _search_recent_laws_async_wrapper(self, query: str, jurisdiction: str = None) -> str:
+        """Async wrapper for web search tool"""
+        self._add_agent_action("web_search", f"Searching web for '{query}' in {jurisdiction or 'global'}")
+        print(f"🔍 Agent executing: Web search for '{query}' in {jurisdiction or 'global'}")
+        results = await self.web_search.search_recent_laws_async(query, jurisdiction)
+        return orjson.dumps(results, default=str).decode()
 
     def _search_country_context_wrapper(self, query: str, country: str) -> str:
         """Wrapper for vector store tool"""
         self._add_agent_action("vector_search", f"Searching vector store for '{query}' in {country}")
         print(f"🔍 Agent executing: Vector search for '{query}' in {country}")
         results = self.vector_store.search_similar(query, country)
-        # Convert ObjectId to string for JSON serialization
-        for result in results:
-            if '_id' in result:
-                result['_id'] = str(result['_id'])
-        return json.dumps(results, indent=2)
+        # default=str serializes ObjectId values
+        return orjson.dumps(results, default=str).decode()
+
+    async def _search_country_context_async_wrapper(self, query: str, country: str) -> str:
+        """Async wrapper for vector store tool (PyMongo is blocking, so run it off the event loop)"""
+        return await asyncio.to_thread(self._search_country_context_wrapper, query, country)
 
     def _build_messages_with_history(self, user_query: str, external_history: list = None) -> list:
         """Build messages list with conversation history and current query"""
         # Use the system prompt from external file
-        messages = [{"role": "system", "content": LEGAL_AI_SYSTEM_PROMPT}]
+        messages = [self._SYSTEM_MESSAGE]
 
-        # Add external history if provided, otherwise use internal history
-        if external_history:
+        # Add external history if provided (even an empty one), otherwise use internal history
+        if external_history is not None:
             messages.extend(external_history)
         else:
             # Add conversation history
-            messages.extend(list(self.conversation_history))
+            messages.extend(self.conversation_history)
 
         # Add current user query
         messages.append({"role": "user", "content": user_query})
 
         return messages
 
-    def _add_to_history(self, user_query: str, assistant_response: str):
+    def _add_to_history(self, user_query: str, assistant_response: str, external_history: list = None):
         """Add user query and assistant response to conversation history"""
+        # Callers that pass their own history also keep it themselves
+        if external_history is not None:
+            return
+
         self.conversation_history.append({"role": "user", "content": user_query})
         self.conversation_history.append({"role": "assistant", "content": assistant_response})
 
         print(f"📚 History updated: {len(self.conversation_history)//2} conversation pairs stored")
 
+    def _parse_tool_calls(self, tool_calls) -> list:
+        """Parse tool call arguments up front so malformed JSON surfaces before any tool runs"""
+        parsed_calls = []
+        for tool_call in tool_calls:
+            function_name = tool_call.function.name
+            arguments = orjson.loads(tool_call.function.arguments)
+            print(f"   └── Calling {function_name} with args: {arguments}")
+            parsed_calls.append((tool_call, function_name, arguments))
+        return parsed_calls
+
+    def _tool_result_message(self, tool_call, function_name: str, content: str) -> dict:
+        """Build the tool-role message answering a single tool call"""
+        return {
+            "tool_call_id": tool_call.id,
+            "role": "tool",
+            "name": function_name,
+            "content": content
+        }
+
+    def _assistant_tool_message(self, response_message) -> dict:
+        """Echo the assistant's tool call request back into the conversation"""
+        assistant_message = {
+            "role": "assistant",
+            "tool_calls": [
+                {
+                    "id": tool_call.id,
+                    "type": "function",
+                    "function": {
+                        "name": tool_call.function.name,
+                        "arguments": tool_call.function.arguments
+                    }
+                } for tool_call in response_message.tool_calls
+            ]
+        }
+
+        # Only add content if it's not None/null
+        if response_message.content is not None:
+            assistant_message["content"] = response_message.content
+
+        return assistant_message
+
+    def _compact_tool_rounds(self, messages: list, start: int, end: int):
+        """Replace tool rounds in messages[start:end] with one compact summary message"""
+        if end - start < 2:
+            return
+
+        summary_lines = []
+        for message in messages[start:end]:
+            if message["role"] == "system":
+                # Summary left by an earlier compaction
+                summary_lines.extend(message["content"].splitlines()[1:])
+            elif message["role"] == "assistant":
+                if message.get("content"):
+                    summary_lines.append(f"- assistant: {message['content']}")
+            else:
+                summary_lines.append(f"- {message['name']}: {message['content'][:self.MAX_TOOL_SUMMARY_CHARS]}")
+
+        messages[start:end] = [{
+            "role": "system",
+            "content": "Prior tool results summary:\n" + "\n".join(summary_lines)
+        }]
+
+    def _prefetch_embeddings(self, parsed_calls: list):
+        """Embed every vector store query of this turn in one batched request"""
+        # Searches for countries without embeddings return early, so don't pay to embed their queries
+        queries = [
+            arguments["query"] for _, function_name, arguments in parsed_calls
+            if function_name == "search_country_context" and "query" in arguments
+            and self.vector_store.is_known_country(arguments.get("country"))
+        ]
+        if len(queries) < 2:
+            return
+        try:
+            # Warms the embedding cache so each search_similar call skips its own request
+            self.vector_store.get_embeddings(queries)
+        except Exception as e:
+            logging.error(f"Batch embedding error: {e}")
+
+    def _execute_tool_calls(self, tool_calls) -> list:
+        """Run independent tool calls in parallel and return tool messages in request order"""
+        parsed_calls = self._parse_tool_calls(tool_calls)
+        self._prefetch_embeddings(parsed_calls)
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=len(parsed_calls)) as executor:
+            futures = {
+                tool_call.id: executor.submit(self.available_tools[function_name]["function"], **arguments)
+                for tool_call, function_name, arguments in parsed_calls
+                if function_name in self.available_tools
+            }
+            for tool_call, function_name, _ in parsed_calls:
+                future = futures.get(tool_call.id)
+                results[tool_call.id] = future.result() if future else f"Error: Tool {function_name} not found"
+
+        # Tool results must follow the assistant message in the original call order
+        return [
+            self._tool_result_message(tool_call, function_name, results[tool_call.id])
+            for tool_call, function_name, _ in parsed_calls
+        ]
+
+    async def _dispatch_async(self, tool_call, function_name: str, arguments: dict) -> dict:
+        """Run a single tool call on the event loop"""
+        if function_name in self.available_tools:
+            tool_result = await self.available_tools[function_name]["async_function"](**arguments)
+        else:
+            tool_result = f"Error: Tool {function_name} not found"
+        return self._tool_result_message(tool_call, function_name, tool_result)
+
+    async def _execute_tool_calls_async(self, tool_calls) -> list:
+        """Await independent tool calls concurrently; gather keeps the request order"""
+        parsed_calls = self._parse_tool_calls(tool_calls)
+        await asyncio.to_thread(self._prefetch_embeddings, parsed_calls)
+        return list(await asyncio.gather(*[
+            self._dispatch_async(tool_call, function_name, arguments)
+            for tool_call, function_name, arguments in parsed_calls
+        ]))
+
+    def _stream_completion(self, sent: list, **request):
+        """
+        Stream one completion, yielding answer text as it arrives and appending each yielded chunk to `sent`.
+        Returns a message-like object with the full content and any tool calls.
+        """
+        stream = self.aiml_client.chat.completions.create(stream=True, **request)
+
+        content_parts = []
+        tool_calls = {}
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+
+            # Tool calls arrive as fragments keyed by index
+            for tool_call_delta in delta.tool_calls or []:
+                tool_call = tool_calls.setdefault(tool_call_delta.index, {"id": None, "name": "", "arguments": ""})
+                if tool_call_delta.id:
+                    tool_call["id"] = tool_call_delta.id
+                if tool_call_delta.function:
+                    tool_call["name"] += tool_call_delta.function.name or ""
+                    tool_call["arguments"] += tool_call_delta.function.arguments or ""
+
+            if delta.content:
+                content_parts.append(delta.content)
+                # Text in a tool-calling turn is not the answer, so stop forwarding once a tool call shows up
+                if not tool_calls:
+                    sent.append(delta.content)
+                    yield delta.content
+
+        return SimpleNamespace(
+            content="".join(content_parts) if content_parts else None,
+            tool_calls=[
+                SimpleNamespace(
+                    id=tool_calls[index]["id"],
+                    function=SimpleNamespace(name=tool_calls[index]["name"], arguments=tool_calls[index]["arguments"])
+                ) for index in sorted(tool_calls)
+            ]
+        )
+
     def chat_with_agent(self, user_query: str, chat_history: list = None) -> str:
         """
         🎯 MAIN AGENT INTEGRATION POINT
         Agent decides whether and which tools to use with iterative capability
         """
+        return "".join(self.chat_with_agent_stream(user_query, chat_history))
 
-        # Tool definitions
-        tools_definition = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "search_recent_laws",
-                    "description": self.available_tools["search_recent_laws"]["description"],
-                    "parameters": self.available_tools["search_recent_laws"]["parameters"]
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "search_country_context",
-                    "description": self.available_tools["search_country_context"]["description"],
-                    "parameters": self.available_tools["search_country_context"]["parameters"]
-                }
-            }
-        ]
+    def chat_with_agent_stream(self, user_query: str, chat_history: list = None):
+        """
+        Streaming variant of chat_with_agent.
+        Yields the final answer in chunks as the model produces it.
+        """
+
+        # Answer text already handed to the caller
+        sent = []
 
         try:
             # Build initial messages with history
             messages = self._build_messages_with_history(user_query, chat_history)
+            history_end = len(messages)
 
             # Calculate the number of previous exchanges
-            if chat_history:
+            if chat_history is not None:
                 previous_exchanges = len(chat_history) // 2
             else:
                 previous_exchanges = len(self.conversation_history) // 2
@@ -158,95 +398,156 @@ class LegalAIAgent:
                 print(f"🔄 Iteration {iteration}/{self.MAX_ITERATIONS}")
 
                 # Agent makes decision
-                response = self.aiml_client.chat.completions.create(
+                response_message = yield from self._stream_completion(
+                    sent,
                     model=self.primary_model, # Use primary model
                     messages=messages,
-                    tools=tools_definition,
+                    tools=self._tools_definition,
                     tool_choice="auto",
                     temperature=0.3
                 )
 
-                response_message = response.choices[0].message
-
                 # If no tools called, we have final response
                 if not response_message.tool_calls:
                     print("✅ Agent decision: No more tools needed - providing final response")
-                    final_response = response_message.content
 
-                    # Add to conversation history
-                    self._add_to_history(user_query, final_response)
+                    # Store exactly what the caller received, including any text streamed before a tool call
+                    self._add_to_history(user_query, "".join(sent), chat_history)
 
-                    return final_response
+                    return
 
                 # Tools were called
                 num_tools = len(response_message.tool_calls)
                 total_tool_calls += num_tools
                 print(f"🔧 Agent decision: Using {num_tools} tool(s) - Total tools used: {total_tool_calls}")
 
+                # Older rounds only matter through their results, so shrink them before adding this one
+                self._compact_tool_rounds(messages, history_end, len(messages))
+
                 # Add agent's tool call message to conversation
-                assistant_message = {
-                    "role": "assistant",
-                    "tool_calls": [
-                        {
-                            "id": tool_call.id,
-                            "type": "function",
-                            "function": {
-                                "name": tool_call.function.name,
-                                "arguments": tool_call.function.arguments
-                            }
-                        } for tool_call in response_message.tool_calls
-                    ]
-                }
+                messages.append(self._assistant_tool_message(response_message))
 
-                # Only add content if it's not None/null
-                if response_message.content is not None:
-                    assistant_message["content"] = response_message.content
+                # Execute all requested tools concurrently
+                messages.extend(self._execute_tool_calls(response_message.tool_calls))
 
-                messages.append(assistant_message)
+                # Continue to next iteration to let agent decide if it needs more tools
+                print(f"🔄 Completed iteration {iteration}, continuing to see if agent needs more information...")
 
-                # Execute each tool
-                for tool_call in response_message.tool_calls:
-                    function_name = tool_call.function.name
-                    arguments = json.loads(tool_call.function.arguments)
+            # If we've reached max iterations, force final response
+            print(f"⚠️ Reached maximum iterations ({self.MAX_ITERATIONS}), generating final response...")
 
-                    print(f"   └── Calling {function_name} with args: {arguments}")
+            # tool_choice="none" forces a plain answer from the gathered results in one call
+            yield from self._stream_completion(
+                sent,
+                model=self.fallback_model, # Use fallback model
+                messages=messages,
+                tools=self._tools_definition,
+                tool_choice="none",
+                temperature=0.3
+            )
 
-                    # Execute the tool
-                    if function_name in self.available_tools:
-                        tool_result = self.available_tools[function_name]["function"](**arguments)
-                    else:
-                        tool_result = f"Error: Tool {function_name} not found"
+            # Store exactly what the caller received, including any text streamed before a tool call
+            self._add_to_history(user_query, "".join(sent), chat_history)
 
-                    # Add tool result to conversation
-                    messages.append({
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "name": function_name,
-                        "content": tool_result
-                    })
+        except Exception as e:
+            logging.error(f"Agent error: {e}")
+
+            if sent:
+                # Part of the answer is already out and can't be taken back; keep history in line with it
+                # rather than tacking the error onto the reply
+                self._add_to_history(user_query, "".join(sent), chat_history)
+                return
+
+            error_response = f"I encountered an error while processing your request: {str(e)}"
+
+            # Still add to history even if there was an error
+            self._add_to_history(user_query, error_response, chat_history)
+
+            yield error_response
+
+    async def chat_with_agent_async(self, user_query: str, chat_history: list = None, actions: list = None) -> str:
+        """
+        Async variant of chat_with_agent for use inside the FastAPI event loop.
+        Tool calls requested in one turn are awaited concurrently.
+        Pass chat_history to keep the run apart from the shared conversation history, and an
+        `actions` list to collect the actions of this run alone; runs may then overlap safely.
+        """
+
+        actions_token = _run_actions.set(actions)
+        try:
+            # Build initial messages with history
+            messages = self._build_messages_with_history(user_query, chat_history)
+            history_end = len(messages)
+
+            # Calculate the number of previous exchanges
+            if chat_history is not None:
+                previous_exchanges = len(chat_history) // 2
+            else:
+                previous_exchanges = len(self.conversation_history) // 2
+
+            print(f"🤖 Agent analyzing query: '{user_query}' (with {previous_exchanges} previous conversations)")
+
+            # Iterative tool calling loop
+            iteration = 0
+            total_tool_calls = 0
+
+            while iteration < self.MAX_ITERATIONS:
+                iteration += 1
+                print(f"🔄 Iteration {iteration}/{self.MAX_ITERATIONS}")
+
+                # Agent makes decision
+                response = await self.async_aiml_client.chat.completions.create(
+                    model=self.primary_model, # Use primary model
+                    messages=messages,
+                    tools=self._tools_definition,
+                    tool_choice="auto",
+                    temperature=0.3
+                )
+
+                response_message = response.choices[0].message
+
+                # If no tools called, we have final response
+                if not response_message.tool_calls:
+                    print("✅ Agent decision: No more tools needed - providing final response")
+                    final_response = response_message.content
+
+                    # Add to conversation history
+                    self._add_to_history(user_query, final_response, chat_history)
+
+                    return final_response
+
+                # Tools were called
+                num_tools = len(response_message.tool_calls)
+                total_tool_calls += num_tools
+                print(f"🔧 Agent decision: Using {num_tools} tool(s) - Total tools used: {total_tool_calls}")
+
+                # Older rounds only matter through their results, so shrink them before adding this one
+                self._compact_tool_rounds(messages, history_end, len(messages))
+
+                # Add agent's tool call message to conversation
+                messages.append(self._assistant_tool_message(response_message))
+
+                # Execute all requested tools concurrently
+                messages.extend(await self._execute_tool_calls_async(response_message.tool_calls))
 
-                # Continue to next iteration to let agent decide if it needs more tools
                 print(f"🔄 Completed iteration {iteration}, continuing to see if agent needs more information...")
 
             # If we've reached max iterations, force final response
             print(f"⚠️ Reached maximum iterations ({self.MAX_ITERATIONS}), generating final response...")
 
-            # Add instruction to provide final answer
-            messages.append({
-                "role": "system",
-                "content": "Please provide your final response based on all the information gathered so far. Do not call any more tools."
-            })
-
-            final_response_obj = self.aiml_client.chat.completions.create(
+            # tool_choice="none" forces a plain answer from the gathered results in one call
+            final_response_obj = await self.async_aiml_client.chat.completions.create(
                 model=self.fallback_model, # Use fallback model
                 messages=messages,
+                tools=self._tools_definition,
+                tool_choice="none",
                 temperature=0.3
             )
 
             final_response = final_response_obj.choices[0].message.content
 
             # Add to conversation history
-            self._add_to_history(user_query, final_response)
+            self._add_to_history(user_query, final_response, chat_history)
 
             return final_response
 
@@ -255,22 +556,36 @@ class LegalAIAgent:
             error_response = f"I encountered an error while processing your request: {str(e)}"
 
             # Still add to history even if there was an error
-            self._add_to_history(user_query, error_response)
+            self._add_to_history(user_query, error_response, chat_history)
 
             return error_response
 
+        finally:
+            _run_actions.reset(actions_token)
+
     def clear_history(self):
         """Clear conversation history"""
         self.conversation_history.clear()
         print("🗑️ Conversation history cleared")
 
-    def get_agent_actions(self):
-        """Get current agent actions"""
-        return self.agent_actions.copy()
+    def get_agent_actions(self, since: int = 0):
+        """Get current agent actions, only those recorded after the `since` id if given"""
+        with self._actions_lock:
+            start = bisect_right(self._action_ids, since) if since else 0
+            return [
+                {"id": action_id, "action": action, "description": description, "timestamp": timestamp}
+                for action_id, action, description, timestamp in islice(zip(
+                    self._action_ids, self._action_names, self._action_descriptions, self._action_timestamps
+                ), start, None)
+            ]
 
     def clear_agent_actions(self):
         """Clear agent actions"""
-        self.agent_actions.clear()
+        with self._actions_lock:
+            self._action_ids.clear()
+            self._action_names.clear()
+            self._action_descriptions.clear()
+            self._action_timestamps.clear()
 
     def show_history(self):
         """Display current conversation history"""
@@ -289,6 +604,20 @@ class LegalAIAgent:
 
     def interactive_chat(self):
         """Interactive chat interface with agent-based tool selection and history management"""
+        asyncio.run(self.interactive_chat_async())
+
+    async def interactive_chat_async(self):
+        """Async REPL: prompts without blocking the event loop and keeps input history"""
+        try:
+            from prompt_toolkit import PromptSession
+            from prompt_toolkit.history import FileHistory
+            session = PromptSession(history=FileHistory(".legal_history"))
+            read_input = session.prompt_async
+        except ImportError:
+            # prompt_toolkit is only needed for this CLI; fall back to input() on a worker thread
+            async def read_input(prompt: str) -> str:
+                return await asyncio.to_thread(input, prompt)
+
         print("🤖 Legal AI Agent initialized!")
         print("Features:")
         print("  • Conversation history: Remembers last 4 exchanges")
@@ -298,7 +627,7 @@ class LegalAIAgent:
         print("-" * 50)
 
         while True:
-            user_input = input("\nYou: ").strip()
+            user_input = (await read_input("\nYou: ")).strip()
 
             if user_input.lower() in ['quit', 'exit', 'bye']:
                 print("🤖 Agent: Goodbye!")
@@ -313,5 +642,16 @@ class LegalAIAgent:
             if not user_input:
                 continue
 
-            print(f"\n🤖 Agent: {self.chat_with_agent(user_input)}")
-            print("-" * 50)
\ No newline at end of file
+            await self._print_streamed_reply(user_input)
+            print("-" * 50)
+
+    async def _print_streamed_reply(self, user_query: str):
+        """Print the agent's answer as it streams in; each chunk is pulled on a worker thread"""
+        stream = self.chat_with_agent_stream(user_query)
+        print("\n🤖 Agent: ", end="", flush=True)
+        while True:
+            chunk = await asyncio.to_thread(next, stream, None)
+            if chunk is None:
+                break
+            print(chunk, end="", flush=True)
+        print()
\ No newline at end of file
@@ -1,25 +1,105 @@
-from pymongo import MongoClient
-from typing import List, Dict
+import time
+import logging
+from pymongo import MongoClient, ReadPreference
+from typing import List, Dict, Optional, Set
+from threading import Lock
+from cachetools import LRUCache
 from services.Client import get_client
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+COUNTRY_REFRESH_SECONDS = 600
+
 class VectorStore:
     """MongoDB vector store for country documents"""
 
-    def __init__(self, connection_string: str, db_name: str = "country_db", collection_name: str = "country_embeddings"):
-        self.client = MongoClient(connection_string)
-        self.db = self.client[db_name]
+    __slots__ = (
+        "client", "db", "collection", "_embedding_cache", "_embedding_cache_lock",
+        "_countries", "_countries_loaded_at",
+    )
+
+    def __init__(self, connection_string: Optional[str] = None, db_name: str = "country_db",
+                 collection_name: str = "country_embeddings", client: Optional[MongoClient] = None):
+        if client is None:
+            # Pooled, read-only client: keep warm connections and let Atlas serve from the nearest member
+            client = MongoClient(
+                connection_string,
+                maxPoolSize=50,
+                minPoolSize=5,
+                retryWrites=False,
+                readPreference="nearest"
+            )
+        self.client = client
+        # Reads may go to the nearest member even when the client is shared with the API
+        self.db = self.client.get_database(db_name, read_preference=ReadPreference.NEAREST)
         self.collection = self.db[collection_name]
 
+        # Embeddings are deterministic per (model, text), so repeated queries skip the API call
+        self._embedding_cache = LRUCache(maxsize=1024)
+        self._embedding_cache_lock = Lock()
+
+        # Countries that have embeddings, refreshed periodically
+        self._countries: Optional[Set[str]] = None
+        self._countries_loaded_at = 0.0
+
     def get_embedding(self, text: str):
         """Generate embedding for query"""
+        key = (EMBEDDING_MODEL, text)
+        with self._embedding_cache_lock:
+            embedding = self._embedding_cache.get(key)
+        if embedding is not None:
+            return embedding
+
         client = get_client()
-        return client.embeddings.create(
-            model="text-embedding-3-small",
+        embedding = client.embeddings.create(
+            model=EMBEDDING_MODEL,
             input=text
         ).data[0].embedding
 
+        with self._embedding_cache_lock:
+            self._embedding_cache[key] = embedding
+        return embedding
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for several queries with a single API request"""
+        with self._embedding_cache_lock:
+            cached = {text: self._embedding_cache.get((EMBEDDING_MODEL, text)) for text in texts}
+        missing = [text for text, embedding in cached.items() if embedding is None]
+
+        if missing:
+            client = get_client()
+            response = client.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=missing
+            )
+            with self._embedding_cache_lock:
+                for text, data in zip(missing, response.data):
+                    cached[text] = data.embedding
+                    self._embedding_cache[(EMBEDDING_MODEL, text)] = data.embedding
+
+        return [cached[text] for text in texts]
+
+    def _known_countries(self) -> Optional[Set[str]]:
+        """Countries present in the collection, or None if they could not be loaded"""
+        now = time.monotonic()
+        if self._countries is None or now - self._countries_loaded_at > COUNTRY_REFRESH_SECONDS:
+            try:
+                self._countries = set(self.collection.distinct("country"))
+                self._countries_loaded_at = now
+            except Exception as e:
+                logging.error(f"Failed to load vector store countries: {e}")
+        return self._countries
+
+    def is_known_country(self, country: str) -> bool:
+        """Whether a country can have results; assumed so when the country list could not be loaded"""
+        countries = self._known_countries()
+        return countries is None or country in countries
+
     def search_similar(self, query: str, country: str, limit: int = 2) -> List[Dict]:
         """Search for similar text in a given country"""
+        # The filter is an exact match, so an unknown country can never return results
+        if not self.is_known_country(country):
+            return []
+
         query_embedding = self.get_embedding(query)
 
         # Build pipeline with filter inside vectorSearch
@@ -29,8 +109,8 @@ class VectorStore:
                     "index": "vector_index",       # must match your Atlas index name
                     "path": "embedding",
                     "queryVector": query_embedding,
-                    "filter": {"country": country},  # ✅ filter by country here
-                    "numCandidates": limit * 3,
+                    "filter": {"country": country},  # ✅ filter by country here (indexed as a filter field)
+                    "numCandidates": max(50, limit * 10),
                     "limit": limit
                 }
             },
@@ -45,4 +125,13 @@ class VectorStore:
 
         results = list(self.collection.aggregate(pipeline))
         print(results)
-        return results
\ No newline at end of file
+        return results
+
+# Shared instances, one per connection string
+_vector_stores: Dict[str, VectorStore] = {}
+
+def get_vector_store(connection_string: str, client: Optional[MongoClient] = None) -> VectorStore:
+    """Get the shared VectorStore for a connection string, reusing `client` if one is given"""
+    if connection_string not in _vector_stores:
+        _vector_stores[connection_string] = VectorStore(connection_string, client=client)
+    return _vector_stores[connection_string]
@@ -1,42 +1,88 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import httpx
 import logging
+import re
 from typing import List, Dict
+from urllib.parse import urlsplit
+
+SERPER_SEARCH_URL = "https://google.serper.dev/search"
 
 class WebSearchAgent:
     """Handles real-time legal information searches"""
 
+    __slots__ = ("api_key", "official_marker", "legal_host_re", "session", "async_client")
+
     def __init__(self, search_api_key: str):
         self.api_key = search_api_key
+        self.official_marker = '.gov'
+        # One pass over the hostname instead of a substring scan per marker
+        self.legal_host_re = re.compile(r"\.gov|legislature|courts|attorney|legal")
 
-    def search_recent_laws(self, query: str, jurisdiction: str = None) -> List[Dict]:
-        """Search for recent legal updates and changes"""
-        # Enhanced query with legal terms
+        # Persistent sessions so searches reuse pooled TCP/TLS connections
+        self.session = requests.Session()
+        self.session.headers.update({"X-API-KEY": self.api_key})
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=10,
+            max_retries=Retry(total=3, backoff_factor=0.3)
+        ))
+        self.async_client = httpx.AsyncClient(
+            headers={"X-API-KEY": self.api_key},
+            timeout=httpx.Timeout(10.0, connect=3.0)
+        )
+
+    def _build_legal_query(self, query: str, jurisdiction: str = None) -> str:
+        """Enhance query with legal terms"""
         legal_query = f"{query} law statute regulation 2024 2025"
         if jurisdiction:
             legal_query += f" {jurisdiction}"
+        return legal_query
+
+    def _filter_legal_sources(self, results: Dict) -> List[Dict]:
+        """Filter and structure legal sources"""
+        legal_sources = []
+        for result in results.get('organic', []):
+            link = result.get('link', '')
+            host = urlsplit(link).hostname or ''
+            # Match on the hostname only; '.gov' also covers national domains like .gov.pk / .gov.uk
+            if self.legal_host_re.search(host):
+                legal_sources.append({
+                    'title': result.get('title'),
+                    'url': link,
+                    'snippet': result.get('snippet'),
+                    'source_type': 'official' if self.official_marker in host else 'legal'
+                })
+
+        return legal_sources
+
+    def search_recent_laws(self, query: str, jurisdiction: str = None) -> List[Dict]:
+        """Search for recent legal updates and changes"""
+        legal_query = self._build_legal_query(query, jurisdiction)
 
         # Use your preferred search API (Serper, Brave, etc.)
         try:
-            response = requests.get(
-                "https://google.serper.dev/search?q=apple+inc&apiKey=",
-                headers={"X-API-KEY": self.api_key},
+            response = self.session.get(
+                SERPER_SEARCH_URL,
+                params={"q": legal_query, "num": 5},
+                timeout=(3, 10)
+            )
+            return self._filter_legal_sources(response.json())
+        except Exception as e:
+            logging.error(f"Web search error: {e}")
+            return []
+
+    async def search_recent_laws_async(self, query: str, jurisdiction: str = None) -> List[Dict]:
+        """Async variant of search_recent_laws that does not block the event loop"""
+        legal_query = self._build_legal_query(query, jurisdiction)
+
+        try:
+            response = await self.async_client.get(
+                SERPER_SEARCH_URL,
                 params={"q": legal_query, "num": 5}
             )
-            results = response.json()
-
-            # Filter and structure legal sources
-            legal_sources = []
-            for result in results.get('organic', []):
-                if any(domain in result.get('link', '') for domain in
-                      ['.gov', 'legislature', 'courts', 'attorney', 'legal']):
-                    legal_sources.append({
-                        'title': result.get('title'),
-                        'url': result.get('link'),
-                        'snippet': result.get('snippet'),
-                        'source_type': 'official' if '.gov' in result.get('link', '') else 'legal'
-                    })
-
-            return legal_sources
+            return self._filter_legal_sources(response.json())
         except Exception as e:
             logging.error(f"Web search error: {e}")
             return []
@@ -1,18 +1,23 @@
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, StringConstraints
 import os
 import logging
 import asyncio
-import json
-from typing import Optional, List, Dict, Any
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+from typing import Optional, List, Dict, Any, Annotated
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
 from jose import JWTError, jwt
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
+from cachetools import TTLCache
+from pymongo.errors import DuplicateKeyError
 
 # Import our custom modules
 from LegalAIAgent import LegalAIAgent
@@ -26,11 +31,22 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepare MongoDB before serving requests and release the pools on shutdown"""
+    await warm_up_mongo()
+    await ensure_indexes()
+    yield
+    if mongo_client is not None:
+        mongo_client.close()
+    password_executor.shutdown(wait=False)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Legal AI Chat API",
     description="API for legal document analysis and chat with AI agent",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -46,33 +62,87 @@ app.add_middleware(
 document_processor = DocumentProcessor()
 image_processor = ImageProcessor()
 
+# Caps in-flight agent runs so a burst of /chat requests doesn't trip the LLM provider's rate limits
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+llm_semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+
 # Database setup
 MONGODB_URI = os.getenv("MONGODB_URI")
-mongo_client: Optional[MongoClient] = None
+mongo_client: Optional[AsyncIOMotorClient] = None
 db = None
 if MONGODB_URI:
     try:
-        mongo_client = MongoClient(MONGODB_URI)
+        # Motor keeps Mongo I/O off the event loop thread
+        mongo_client = AsyncIOMotorClient(
+            MONGODB_URI,
+            minPoolSize=10,
+            maxPoolSize=50,
+            waitQueueTimeoutMS=2000
+        )
         db = mongo_client.get_database()
-        # Ensure indexes
-        db.users.create_index("email", unique=True)
-        db.chats.create_index([("user_id", 1), ("updated_at", -1)])
-        db.messages.create_index([("chat_id", 1), ("timestamp", 1)])
+    except Exception as e:
+        logging.error(f"Failed to connect to MongoDB: {e}")
+
+# Case-insensitive email matching, enforced by the unique users index
+EMAIL_COLLATION = {"locale": "en", "strength": 2}
+# Holds every field a chat listing filters, sorts or returns, so listings never fetch documents
+CHAT_LIST_INDEX = [("user_id", 1), ("updated_at", -1), ("title", 1), ("_id", 1)]
+# Indexes replaced by the ones above, dropped wherever an older deployment still has them:
+# the case-sensitive unique email index, and chat indexes with the same prefix as CHAT_LIST_INDEX
+SUPERSEDED_INDEXES = {
+    "users": ("email_1",),
+    "chats": ("user_id_1_updated_at_-1", "user_id_1_updated_at_-1_title_1"),
+}
+
+async def warm_up_mongo():
+    """Open pooled connections before the first request instead of during it"""
+    if db is None:
+        return
+    try:
+        await db.command("ping")
+        await asyncio.gather(db.users.find_one(), db.chats.find_one(), db.messages.find_one())
+    except Exception as e:
+        logging.error(f"MongoDB warm-up failed: {e}")
+
+async def ensure_indexes():
+    if db is None:
+        return
+    try:
+        index_builds = [
+            db.users.create_index("email", unique=True, collation=EMAIL_COLLATION, name="email_ci"),
+            db.chats.create_index(CHAT_LIST_INDEX),
+            db.messages.create_index([("chat_id", 1), ("timestamp", 1)]),
+        ]
+        await asyncio.gather(*index_builds)
+        for collection_name, index_names in SUPERSEDED_INDEXES.items():
+            collection = db[collection_name]
+            existing_indexes = await collection.index_information()
+            for name in index_names:
+                if name in existing_indexes:
+                    await collection.drop_index(name)
         print("MongoDB connected successfully")
     except Exception as e:
         logging.error(f"Failed to connect to MongoDB: {e}")
 
 # Auth config
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Cost 10 is ~4x cheaper than passlib's default of 12; existing hashes keep verifying at their own cost
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "10"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-secret-change-me")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_EXPIRES_MINUTES = int(os.getenv("JWT_EXPIRES_MINUTES", "10080"))  # default 7 days
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# bcrypt is CPU-bound; run it on its own pool so it neither blocks the event loop
+# nor competes with the default executor used for document parsing and vector search
+password_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="bcrypt")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, pwd_context.hash, password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, pwd_context.verify, plain_password, hashed_password)
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -80,12 +150,21 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
 
-def get_current_user(authorization: Optional[str] = None) -> Dict[str, Any]:
+# Validated tokens -> (user doc, exp epoch). The short TTL bounds how long a deleted user stays cached.
+auth_cache: TTLCache = TTLCache(maxsize=10000, ttl=60)
+
+async def get_current_user(authorization: Optional[str] = None) -> Dict[str, Any]:
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing Authorization header")
     scheme, _, token = authorization.partition(" ")
     if scheme.lower() != "bearer" or not token:
         raise HTTPException(status_code=401, detail="Invalid Authorization header")
+    cached = auth_cache.get(token)
+    if cached is not None:
+        user, expires_at = cached
+        if expires_at > time.time():
+            return user
+        auth_cache.pop(token, None)
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
         user_id: str = payload.get("sub")
@@ -93,32 +172,49 @@ def get_current_user(authorization: Optional[str] = None) -> Dict[str, Any]:
             raise HTTPException(status_code=401, detail="Invalid token payload")
         if db is None:
             raise HTTPException(status_code=503, detail="Database not available")
-        user = db.users.find_one({"_id": ObjectId(user_id)})
+        user = await db.users.find_one({"_id": ObjectId(user_id)})
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         user["id"] = str(user["_id"])  # serialize id
+        auth_cache[token] = (user, payload.get("exp", 0))
         return user
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
 # Serialization helpers
+def to_iso(value: Any) -> Any:
+    """Render a stored timestamp as ISO-8601; documents written before BSON dates hold strings already"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
 def serialize_chat(chat: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "id": str(chat["_id"]),
         "title": chat.get("title", "Untitled"),
         "userId": str(chat["user_id"]) if isinstance(chat.get("user_id"), ObjectId) else chat.get("user_id"),
-        "createdAt": chat.get("created_at"),
-        "updatedAt": chat.get("updated_at"),
+        "createdAt": to_iso(chat.get("created_at")),
+        "updatedAt": to_iso(chat.get("updated_at")),
     }
 
+# Only the fields serialize_message reads
+MESSAGE_PROJECTION = {
+    "chat_id": 1,
+    "user_id": 1,
+    "role": 1,
+    "content": 1,
+    "timestamp": 1,
+    "file": 1,
+    "structured_response": 1,
+}
+
 def serialize_message(msg: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "id": str(msg["_id"]),
-        "chatId": str(msg["chat_id"]) if isinstance(msg.get("chat_id"), ObjectId) else msg.get("chat_id"),
-        "userId": str(msg["user_id"]) if isinstance(msg.get("user_id"), ObjectId) else msg.get("user_id"),
+        # Messages are only ever written with ObjectId references
+        "chatId": str(msg["chat_id"]),
+        "userId": str(msg["user_id"]),
         "role": msg.get("role"),
         "content": msg.get("content"),
-        "timestamp": msg.get("timestamp"),
+        "timestamp": to_iso(msg.get("timestamp")),
         "file": msg.get("file"),
         "structured_response": msg.get("structured_response"),
     }
@@ -133,7 +229,9 @@ try:
     
     legal_agent = LegalAIAgent(
         search_api_key=search_api_key,
-        mongo_connection_string=mongo_connection_string
+        mongo_connection_string=mongo_connection_string,
+        # Motor wraps a PyMongo client; share it rather than opening a second pool
+        mongo_client=mongo_client.delegate if mongo_client is not None else None
     )
     logger.info("Legal AI Agent initialized successfully")
 except Exception as e:
@@ -141,6 +239,9 @@ except Exception as e:
     legal_agent = None
 
 # Pydantic models
+# Trimmed during validation; passwords are deliberately left untouched
+StrippedStr = Annotated[str, StringConstraints(strip_whitespace=True)]
+
 class ChatRequest(BaseModel):
     message: str
     context: Optional[str] = None
@@ -165,12 +266,12 @@ class HealthResponse(BaseModel):
     agent_ready: bool
 
 class RegisterRequest(BaseModel):
-    name: str
-    email: str
+    name: StrippedStr
+    email: StrippedStr
     password: str
 
 class LoginRequest(BaseModel):
-    email: str
+    email: StrippedStr
     password: str
 
 class UserOut(BaseModel):
@@ -192,6 +293,25 @@ class HistoryResponse(BaseModel):
     success: bool = True
     chats: List[ChatSummary]
 
+class MessageOut(BaseModel):
+    id: str
+    chatId: str
+    userId: str
+    role: Optional[str] = None
+    content: Optional[str] = None
+    timestamp: Optional[str] = None
+    file: Optional[Any] = None
+    structured_response: Optional[Any] = None
+
+class ChatDetail(BaseModel):
+    id: str
+    title: str
+    messages: List[MessageOut]
+
+class ChatDetailResponse(BaseModel):
+    success: bool = True
+    chat: ChatDetail
+
 # Health check endpoint
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
@@ -207,16 +327,17 @@ async def register(payload: RegisterRequest):
     if db is None:
         raise HTTPException(status_code=503, detail="Database not available")
     try:
-        existing = db.users.find_one({"email": payload.email.lower()})
+        email = payload.email
+        existing = await db.users.find_one({"email": email}, collation=EMAIL_COLLATION)
         if existing:
             raise HTTPException(status_code=400, detail="Email already registered")
         user_doc = {
-            "name": payload.name.strip(),
-            "email": payload.email.lower().strip(),
-            "password": hash_password(payload.password),
-            "created_at": datetime.utcnow().isoformat(),
+            "name": payload.name,
+            "email": email,
+            "password": await hash_password(payload.password),
+            "created_at": datetime.utcnow(),
         }
-        result = db.users.insert_one(user_doc)
+        result = await db.users.insert_one(user_doc)
         user_id = str(result.inserted_id)
         token = create_access_token({"sub": user_id})
         return AuthResponse(
@@ -225,6 +346,9 @@ async def register(payload: RegisterRequest):
         )
     except HTTPException:
         raise
+    except DuplicateKeyError:
+        # Lost a race with a concurrent registration for the same address
+        raise HTTPException(status_code=400, detail="Email already registered")
     except Exception as e:
         logger.error(f"Register error: {e}")
         raise HTTPException(status_code=500, detail="Registration failed")
@@ -234,8 +358,8 @@ async def login(payload: LoginRequest):
     if db is None:
         raise HTTPException(status_code=503, detail="Database not available")
     try:
-        user = db.users.find_one({"email": payload.email.lower().strip()})
-        if not user or not verify_password(payload.password, user.get("password", "")):
+        user = await db.users.find_one({"email": payload.email}, collation=EMAIL_COLLATION)
+        if not user or not await verify_password(payload.password, user.get("password", "")):
             raise HTTPException(status_code=401, detail="Invalid credentials")
         user_id = str(user["_id"])
         token = create_access_token({"sub": user_id})
@@ -250,19 +374,30 @@ async def login(payload: LoginRequest):
         raise HTTPException(status_code=500, detail="Login failed")
 
 # Real-time agent actions stream
+SSE_HEARTBEAT_SECONDS = 15
+
 @app.get("/chat/actions/stream")
-async def stream_agent_actions():
+async def stream_agent_actions(last_event_id: Optional[str] = Header(None)):
     """Stream agent actions in real-time using Server-Sent Events"""
     
+    # Per-connection cursor; reconnecting clients resume from the id they last saw
+    last_sent_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    
     async def event_stream():
+        nonlocal last_sent_id
         while True:
-            if legal_agent:
-                actions = legal_agent.get_agent_actions()
+            if not legal_agent:
+                await asyncio.sleep(SSE_HEARTBEAT_SECONDS)
+            elif await legal_agent.wait_for_actions(since=last_sent_id, timeout=SSE_HEARTBEAT_SECONDS):
+                actions = legal_agent.get_agent_actions(since=last_sent_id)
                 if actions:
-                    # Send latest actions
-                    yield f"data: {json.dumps(actions)}\n\n"
+                    # Send only the actions this client has not seen yet
+                    last_sent_id = actions[-1]["id"]
+                    yield f"id: {last_sent_id}\ndata: {orjson.dumps(actions).decode()}\n\n"
+                continue
             
-            await asyncio.sleep(1)  # Check every second
+            # Comment line keeps idle connections open through proxies
+            yield ": heartbeat\n\n"
     
     return StreamingResponse(
         event_stream(),
@@ -274,6 +409,13 @@ async def stream_agent_actions():
         }
     )
 
+# Stored messages handed to the agent as conversation context (4 user/assistant pairs)
+CHAT_HISTORY_MESSAGES = LegalAIAgent.MAX_HISTORY_PAIRS * 2
+
+async def no_result() -> None:
+    """Placeholder awaitable for optional steps in asyncio.gather"""
+    return None
+
 # Unified chat endpoint
 @app.post("/chat", response_model=ChatResponse)
 async def chat_with_agent(
@@ -294,32 +436,53 @@ async def chat_with_agent(
     """
     
     # Auth
-    user = get_current_user(authorization)
+    user = await get_current_user(authorization)
 
     if not legal_agent:
         raise HTTPException(status_code=503, detail="Legal AI Agent not available")
     
     try:
-        # Clear previous agent actions
-        legal_agent.clear_agent_actions()
-        
-        document_text = None
-        image_text = None
-        total_word_count = 0
-        
-        # Process document if provided
+        if db is None:
+            raise HTTPException(status_code=503, detail="Database not available")
+
+        user_obj_id = user["_id"]
+        chat_obj_id: Optional[ObjectId] = None
+        if chat_id:
+            try:
+                chat_obj_id = ObjectId(chat_id)
+            except Exception:
+                raise HTTPException(status_code=400, detail="Invalid chat_id")
+
+        # Check the chat exists and belongs to the user before spending any work on the uploads;
+        # its latest messages are what the agent remembers of this conversation
+        chat_history: List[Dict[str, Any]] = []
+        if chat_obj_id:
+            chat_doc, recent_messages = await asyncio.gather(
+                db.chats.find_one({"_id": chat_obj_id, "user_id": user_obj_id}, projection={"_id": 1}),
+                db.messages.find(
+                    {"chat_id": chat_obj_id}, {"_id": 0, "role": 1, "content": 1}
+                ).sort("timestamp", -1).limit(CHAT_HISTORY_MESSAGES).to_list(length=CHAT_HISTORY_MESSAGES)
+            )
+            if not chat_doc:
+                raise HTTPException(status_code=404, detail="Chat not found")
+            chat_history = recent_messages[::-1]
+
         if document:
             logger.info(f"Processing document: {document.filename}")
-            document_text = await document_processor.process_document(document)
-            if document_text:
-                total_word_count += len(document_text.split())
-        
-        # Process image if provided
         if image:
             logger.info(f"Processing image: {image.filename}")
-            image_text = await image_processor.process_image(image)
-            if image_text:
-                total_word_count += len(image_text.split())
+
+        # Document parsing and OCR are independent, so run them together
+        document_text, image_text = await asyncio.gather(
+            document_processor.process_document(document) if document else no_result(),
+            image_processor.process_image(image) if image else no_result()
+        )
+
+        total_word_count = 0
+        if document_text:
+            total_word_count += len(document_text.split())
+        if image_text:
+            total_word_count += len(image_text.split())
         
         # Add context word count if provided
         if context:
@@ -351,56 +514,55 @@ async def chat_with_agent(
             final_prompt = message
         
         # Persist conversation: create or use existing chat
-        if db is None:
-            raise HTTPException(status_code=503, detail="Database not available")
-
-        chat_obj_id: Optional[ObjectId] = None
-        if chat_id:
-            try:
-                chat_obj_id = ObjectId(chat_id)
-            except Exception:
-                raise HTTPException(status_code=400, detail="Invalid chat_id")
-            chat_doc = db.chats.find_one({"_id": chat_obj_id, "user_id": user["_id"]})
-            if not chat_doc:
-                raise HTTPException(status_code=404, detail="Chat not found")
-        else:
-            # Create new chat
+        new_chat = chat_obj_id is None
+        if new_chat:
+            # Create new chat; updated_at is already current, so it needs no later touch
             title = (message[:50] + ("..." if len(message) > 50 else "")) or "New conversation"
+            created_at = datetime.utcnow()
             chat_doc = {
-                "user_id": user["_id"],
+                "user_id": user_obj_id,
                 "title": title,
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat(),
+                "created_at": created_at,
+                "updated_at": created_at,
             }
-            result = db.chats.insert_one(chat_doc)
+            result = await db.chats.insert_one(chat_doc)
             chat_obj_id = result.inserted_id
+        chat_id_str = str(chat_obj_id)
 
-        # Insert user message
+        # User message (written together with the reply below)
         user_msg_doc = {
             "chat_id": chat_obj_id,
-            "user_id": user["_id"],
+            "user_id": user_obj_id,
             "role": "user",
             "content": message,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.utcnow(),
         }
-        db.messages.insert_one(user_msg_doc)
 
         # Get response from Legal AI Agent
         logger.info("Sending request to Legal AI Agent")
-        response = legal_agent.chat_with_agent(final_prompt)
+        # The history and action list belong to this request, so concurrent runs don't mix them up
+        agent_actions: List[Dict[str, Any]] = []
+        async with llm_semaphore:
+            response = await legal_agent.chat_with_agent_async(
+                final_prompt, chat_history=chat_history, actions=agent_actions
+            )
         
-        # Insert assistant message
+        # Assistant message
         assistant_msg_doc = {
             "chat_id": chat_obj_id,
-            "user_id": user["_id"],
+            "user_id": user_obj_id,
             "role": "assistant",
             "content": response,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.utcnow(),
         }
-        db.messages.insert_one(assistant_msg_doc)
-
-        # Update chat timestamp and title if new
-        db.chats.update_one({"_id": chat_obj_id}, {"$set": {"updated_at": datetime.utcnow().isoformat()}})
+        # Persist both messages in one round trip; an existing chat moves to the top of the history
+        # only now that the message has been accepted
+        await asyncio.gather(
+            db.messages.insert_many([user_msg_doc, assistant_msg_doc], ordered=False),
+            db.chats.update_one(
+                {"_id": chat_obj_id}, {"$set": {"updated_at": datetime.utcnow()}}
+            ) if not new_chat else no_result()
+        )
 
         return ChatResponse(
             response=response,
@@ -408,8 +570,8 @@ async def chat_with_agent(
             image_text=image_text,
             prompt=final_prompt,
             word_count=total_word_count if total_word_count > 0 else None,
-            agent_actions=legal_agent.get_agent_actions(),
-            chat_id=str(chat_obj_id)
+            agent_actions=agent_actions,
+            chat_id=chat_id_str
         )
         
     except HTTPException:
@@ -434,24 +596,31 @@ async def clear_conversation():
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # History endpoints
+HISTORY_LIMIT = 200
+
 @app.get("/history", response_model=HistoryResponse)
 async def get_history(authorization: Optional[str] = Header(None)):
-    user = get_current_user(authorization)
+    user = await get_current_user(authorization)
     if db is None:
         raise HTTPException(status_code=503, detail="Database not available")
-    chats = list(db.chats.find({"user_id": user["_id"]}).sort("updated_at", -1))
+    # Only the summary fields, newest first, bounded; covered by CHAT_LIST_INDEX
+    chats = await db.chats.find(
+        {"user_id": user["_id"]},
+        {"_id": 1, "title": 1, "updated_at": 1}
+    ).sort("updated_at", -1).limit(HISTORY_LIMIT).to_list(length=HISTORY_LIMIT)
     summaries = [
         ChatSummary(
             id=str(c["_id"]),
             title=c.get("title", "Untitled"),
-            updatedAt=c.get("updated_at", "")
+            updatedAt=to_iso(c.get("updated_at", ""))
         ) for c in chats
     ]
     return HistoryResponse(chats=summaries)
 
-@app.get("/history/{chat_id}")
+# The response model lets FastAPI serialize the message list straight to JSON with pydantic-core
+@app.get("/history/{chat_id}", response_model=ChatDetailResponse)
 async def get_chat_by_id(chat_id: str, authorization: Optional[str] = Header(None)):
-    user = get_current_user(authorization)
+    user = await get_current_user(authorization)
     if db is None:
         raise HTTPException(status_code=503, detail="Database not available")
     try:
@@ -459,14 +628,14 @@ async def get_chat_by_id(chat_id: str, authorization: Optional[str] = Header(Non
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid chat_id")
 
-    chat = db.chats.find_one({"_id": chat_obj_id, "user_id": user["_id"]})
+    chat = await db.chats.find_one({"_id": chat_obj_id, "user_id": user["_id"]})
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
-    msgs = list(db.messages.find({"chat_id": chat_obj_id}).sort("timestamp", 1))
+    msgs = await db.messages.find({"chat_id": chat_obj_id}, MESSAGE_PROJECTION).sort("timestamp", 1).to_list(length=None)
     return {
         "success": True,
         "chat": {
-            "id": str(chat["_id"]),
+            "id": str(chat_obj_id),
             "title": chat.get("title", "Untitled"),
             "messages": [serialize_message(m) for m in msgs],
         }
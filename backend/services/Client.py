@@ -1,9 +1,12 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# The SDK retries 429s and transient 5xx errors with exponential backoff, honoring Retry-After
+AIML_MAX_RETRIES = int(os.getenv("AIML_MAX_RETRIES", "3"))
+
 # Centralized client configuration
 def get_aiml_client():
     """Get a configured AIML client instance"""
@@ -14,10 +17,24 @@ def get_aiml_client():
     return OpenAI(
         base_url="https://api.aimlapi.com/v1",
         api_key=aiml_api_key,
+        max_retries=AIML_MAX_RETRIES,
+    )
+
+def get_async_aiml_client():
+    """Get a configured async AIML client instance"""
+    aiml_api_key = os.getenv("AIML_API_KEY")
+    if not aiml_api_key:
+        raise ValueError("AIML_API_KEY environment variable is not set")
+
+    return AsyncOpenAI(
+        base_url="https://api.aimlapi.com/v1",
+        api_key=aiml_api_key,
+        max_retries=AIML_MAX_RETRIES,
     )
 
-# Create a singleton instance
+# Create singleton instances
 _aiml_client = None
+_async_aiml_client = None
 
 def get_client():
     """Get the singleton AIML client instance"""
@@ -26,6 +43,13 @@ def get_client():
         _aiml_client = get_aiml_client()
     return _aiml_client
 
+def get_async_client():
+    """Get the singleton async AIML client instance"""
+    global _async_aiml_client
+    if _async_aiml_client is None:
+        _async_aiml_client = get_async_aiml_client()
+    return _async_aiml_client
+
 # Example usage (can be removed if not needed)
 if __name__ == "__main__":
     try:
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class AsyncBatchQueue:
+    """Group concurrent requests into small batches for a worker that handles many at once"""
+
+    def __init__(
+        self,
+        process_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 8,
+        max_wait_time: float = 0.05
+    ):
+        """
+        Args:
+            process_fn: Coroutine taking a list of items and returning their results in the same order
+            max_batch_size: Most items handed to process_fn at once
+            max_wait_time: Seconds to keep collecting once a batch has more than one item
+        """
+        self.process_fn = process_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_time = max_wait_time
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._batches = set()  # running batches, referenced so they aren't garbage collected
+
+    async def add_request(self, item: Any) -> Any:
+        """Queue an item and wait for its result"""
+        loop = asyncio.get_running_loop()
+        if self._collector is None or self._collector.done():
+            self._queue = asyncio.Queue()
+            self._collector = loop.create_task(self._collect())
+
+        future = loop.create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def _collect(self):
+        """Form batches from the queue and start each one without waiting for it to finish"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+
+            # A lone request is dispatched at once; only wait for company when others are already queued
+            if not self._queue.empty():
+                deadline = loop.time() + self.max_wait_time
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+            task = loop.create_task(self._dispatch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _dispatch(self, batch):
+        """Run one batch and resolve each caller's future"""
+        items = [item for item, _ in batch]
+        try:
+            results = await self.process_fn(items)
+        except Exception as e:
+            logger.error(f"Batch of {len(items)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            # Callers that gave up (e.g. a cancelled request) just drop their result
+            if not future.done():
+                future.set_result(result)
@@ -1,14 +1,19 @@
 import os
+import re
+import asyncio
 import tempfile
 import logging
-from typing import Optional
+from typing import Optional, BinaryIO
 from fastapi import UploadFile, HTTPException
-import PyPDF2
+from pypdf import PdfReader
 from docx import Document
-import io
 
 logger = logging.getLogger(__name__)
 
+# Runs of whitespace within a line, and line breaks plus the blank lines / padding around them
+_INLINE_WS_RE = re.compile(r'[^\S\n]+')
+_LINE_BREAK_RE = re.compile(r' ?\n[ \n]*')
+
 class DocumentProcessor:
     """Process various document formats and extract text content"""
     
@@ -18,6 +23,8 @@ class DocumentProcessor:
             'docx': self._process_docx,
             'txt': self._process_txt
         }
+        self.max_words = 500
+        self.max_file_size = 20 * 1024 * 1024  # 20MB
     
     async def process_document(self, file: UploadFile) -> Optional[str]:
         """
@@ -43,21 +50,35 @@ class DocumentProcessor:
                     detail=f"Unsupported file format: {file_extension}. Supported: {', '.join(self.supported_formats.keys())}"
                 )
             
-            # Read file content
-            content = await file.read()
-            if not content:
+            # Parse straight from the spooled upload instead of copying it into memory
+            upload = file.file
+            file_size = file.size
+            if file_size is None:
+                upload.seek(0, os.SEEK_END)
+                file_size = upload.tell()
+            upload.seek(0)
+            
+            if not file_size:
                 raise HTTPException(status_code=400, detail="Empty file")
             
+            # Check file size
+            if file_size > self.max_file_size:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"File too large ({file_size / 1024 / 1024:.1f}MB). Maximum allowed: {self.max_file_size / 1024 / 1024}MB"
+                )
+            
             # Process based on file type
             processor = self.supported_formats[file_extension]
-            text = processor(content)
+            # Parsing is CPU-bound, so keep it off the event loop
+            text = await asyncio.to_thread(processor, upload, self.max_words)
             
             if not text or not text.strip():
                 raise HTTPException(status_code=400, detail="No text content found in document")
             
             # Clean and limit text
             cleaned_text = self._clean_text(text)
-            limited_text = self._limit_words(cleaned_text, max_words=500)
+            limited_text = self._limit_words(cleaned_text, max_words=self.max_words)
             
             logger.info(f"Successfully processed {file.filename}: {len(limited_text.split())} words")
             return limited_text
@@ -72,42 +93,52 @@ class DocumentProcessor:
         """Extract file extension from filename"""
         return filename.lower().split('.')[-1] if '.' in filename else ''
     
-    def _process_pdf(self, content: bytes) -> str:
-        """Extract text from PDF content"""
+    def _process_pdf(self, file_obj: BinaryIO, max_words: int) -> str:
+        """Extract text from PDF content, stopping once past max_words"""
         try:
-            pdf_file = io.BytesIO(content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            pdf_reader = PdfReader(file_obj)
             
-            text = ""
+            page_texts = []
+            word_count = 0
             for page in pdf_reader.pages:
                 page_text = page.extract_text()
                 if page_text:
-                    text += page_text + "\n"
+                    page_texts.append(page_text)
+                    word_count += len(page_text.split())
+                    # The rest would be cut by _limit_words anyway
+                    if word_count > max_words:
+                        break
             
-            return text.strip()
+            return "\n".join(page_texts).strip()
         except Exception as e:
             logger.error(f"PDF processing error: {e}")
             raise Exception(f"Failed to process PDF: {str(e)}")
     
-    def _process_docx(self, content: bytes) -> str:
-        """Extract text from DOCX content"""
+    def _process_docx(self, file_obj: BinaryIO, max_words: int) -> str:
+        """Extract text from DOCX content, stopping once past max_words"""
         try:
-            docx_file = io.BytesIO(content)
-            doc = Document(docx_file)
+            doc = Document(file_obj)
             
-            text = ""
+            paragraphs = []
+            word_count = 0
             for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text += paragraph.text + "\n"
+                paragraph_text = paragraph.text
+                if paragraph_text.strip():
+                    paragraphs.append(paragraph_text)
+                    word_count += len(paragraph_text.split())
+                    if word_count > max_words:
+                        break
             
-            return text.strip()
+            return "\n".join(paragraphs).strip()
         except Exception as e:
             logger.error(f"DOCX processing error: {e}")
             raise Exception(f"Failed to process DOCX: {str(e)}")
     
-    def _process_txt(self, content: bytes) -> str:
+    def _process_txt(self, file_obj: BinaryIO, max_words: int) -> str:
         """Extract text from TXT content"""
         try:
+            content = file_obj.read()
+            
             # Try different encodings
             encodings = ['utf-8', 'latin-1', 'cp1252']
             
@@ -128,17 +159,9 @@ class DocumentProcessor:
         if not text:
             return ""
         
-        # Remove excessive whitespace
-        lines = text.split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            # Remove excessive spaces
-            cleaned_line = ' '.join(line.split())
-            if cleaned_line:
-                cleaned_lines.append(cleaned_line)
-        
-        return '\n'.join(cleaned_lines)
+        # Collapse spaces within lines, then drop blank lines and line padding
+        text = _INLINE_WS_RE.sub(' ', text)
+        return _LINE_BREAK_RE.sub('\n', text).strip()
     
     def _limit_words(self, text: str, max_words: int = 500) -> str:
         """Limit text to maximum number of words"""
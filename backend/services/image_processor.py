@@ -1,20 +1,90 @@
 import os
+import re
+import base64
+import hashlib
+import asyncio
 import logging
-from typing import Optional
+import threading
+from typing import Optional, BinaryIO, Tuple
 from fastapi import UploadFile, HTTPException
 import io
-from PIL import Image
+import tempfile
+from PIL import Image, ImageFilter, ImageStat
 import pytesseract
-from services.Client import get_client
+from pytesseract import Output
+from cachetools import TTLCache
+
+# One OpenMP thread per Tesseract call; must be set before the library is loaded.
+# Parallelism comes from running several OCR workers instead.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+try:
+    from tesserocr import PyTessBaseAPI, PSM
+except ImportError:
+    # tesserocr needs libtesseract headers to build; fall back to the pytesseract CLI wrapper
+    PyTessBaseAPI = None
+from services.Client import get_async_client
+from services.batch_queue import AsyncBatchQueue
 
 logger = logging.getLogger(__name__)
 
+# Runs of whitespace within a line, and line breaks plus the blank lines / padding around them
+_INLINE_WS_RE = re.compile(r'[^\S\n]+')
+_LINE_BREAK_RE = re.compile(r' ?\n[ \n]*')
+
+# Attempts after the first on 408/409/429/5xx and connection errors; the SDK backs off
+# exponentially and honors Retry-After, and gives up immediately on other client errors
+VISION_MAX_RETRIES = 3
+# Enough for the 500 words kept downstream (~1.3 tokens per word)
+VISION_MAX_TOKENS = 700
+# Images above this are base64-encoded in a worker thread
+INLINE_ENCODE_LIMIT = 1024 * 1024  # 1MB
+# Longer edges are downscaled to this before OCR and upload; extra resolution only adds Tesseract work
+MAX_IMAGE_EDGE = 2000
+DOWNSCALED_JPEG_QUALITY = 85
+# Modes handed to Tesseract without conversion
+OCR_IMAGE_MODES = ('1', 'L', 'RGB')
+# OCR output is trusted without a vision call when it is at least this long and this confident (0-100)
+MIN_OCR_CHARS = 10
+MIN_OCR_CONFIDENCE = 60
+# Mean edge strength (0-255) on a small grayscale preview above which an image likely holds text;
+# blank scans, gradients and simple logos sit well below it
+TEXT_EDGE_THRESHOLD = 2.0
+EDGE_PREVIEW_SIZE = (512, 512)
+# Leading bytes of each supported format; WebP is a RIFF container checked separately
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG', 'png'),
+    (b'BM', 'bmp'),
+    (b'II*\x00', 'tiff'),
+    (b'MM\x00*', 'tiff'),
+)
+SIGNATURE_LENGTH = 16
+# Without tesserocr, concurrent uploads are OCR'd together, so the Tesseract CLI loads its model once per batch
+OCR_BATCH_SIZE = 8
+OCR_BATCH_WAIT_SECONDS = 0.05
+# Re-uploads of the same image (retries, refreshes) reuse the extracted text
+TEXT_CACHE_SIZE = 1024
+TEXT_CACHE_TTL_SECONDS = 3600
+HASH_CHUNK_SIZE = 1024 * 1024
+# Formats vision APIs reject; sent as PNG instead
+VISION_TRANSCODE_FORMATS = {'bmp', 'tiff'}
+
 class ImageProcessor:
     """Process images and extract text content using OCR and AI vision"""
     
     def __init__(self):
-        self.supported_formats = {'jpg', 'jpeg', 'png', 'bmp', 'tiff', 'webp'}
+        self.supported_formats = {'jpeg', 'png', 'bmp', 'tiff', 'webp'}
+        self.max_words = 500
         self.max_file_size = 10 * 1024 * 1024  # 10MB
+        # One loaded Tesseract API per worker thread; a handle is not thread-safe but is reusable
+        self._tess_local = threading.local()
+        # Caps in-flight OCR batches so bursts of uploads don't starve the shared thread pool
+        self._ocr_semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+        self._ocr_queue = AsyncBatchQueue(
+            self._ocr_batch, max_batch_size=OCR_BATCH_SIZE, max_wait_time=OCR_BATCH_WAIT_SECONDS
+        )
+        # Content hash -> extracted text; only touched from the event loop
+        self._text_cache = TTLCache(maxsize=TEXT_CACHE_SIZE, ttl=TEXT_CACHE_TTL_SECONDS)
     
     async def process_image(self, file: UploadFile) -> Optional[str]:
         """
@@ -31,38 +101,45 @@ class ImageProcessor:
             if not file.filename:
                 raise HTTPException(status_code=400, detail="No filename provided")
             
-            # Get file extension
-            file_extension = self._get_file_extension(file.filename)
+            # Work from the spooled upload (in memory up to 1MB, on disk past that) instead of
+            # copying it into memory; the size is known before anything is read
+            upload = file.file
+            file_size = file.size
+            if file_size is None:
+                upload.seek(0, os.SEEK_END)
+                file_size = upload.tell()
+            upload.seek(0)
             
-            if file_extension not in self.supported_formats:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Unsupported image format: {file_extension}. Supported: {', '.join(self.supported_formats)}"
-                )
-            
-            # Read file content
-            content = await file.read()
-            if not content:
+            if not file_size:
                 raise HTTPException(status_code=400, detail="Empty file")
             
             # Check file size
-            if len(content) > self.max_file_size:
+            if file_size > self.max_file_size:
                 raise HTTPException(
-                    status_code=400, 
-                    detail=f"File too large ({len(content) / 1024 / 1024:.1f}MB). Maximum allowed: {self.max_file_size / 1024 / 1024}MB"
+                    status_code=413, 
+                    detail=f"File too large ({file_size / 1024 / 1024:.1f}MB). Maximum allowed: {self.max_file_size / 1024 / 1024}MB"
+                )
+            
+            # Trust the content, not the filename: a renamed file must not reach the decoder
+            image_format = self._detect_format(upload.read(SIGNATURE_LENGTH))
+            upload.seek(0)
+            if image_format is None:
+                raise HTTPException(
+                    status_code=415, 
+                    detail=f"Unsupported image format. Supported: {', '.join(sorted(self.supported_formats))}"
                 )
             
             # Process image
-            text = await self._extract_text_from_image(content)
+            text = await self._extract_text_from_image(upload, image_format)
             
             if not text or not text.strip():
                 raise HTTPException(status_code=400, detail="No text content found in image")
             
             # Clean and limit text
             cleaned_text = self._clean_text(text)
-            limited_text = self._limit_words(cleaned_text, max_words=500)
+            limited_text, word_count = self._limit_words(cleaned_text, max_words=self.max_words)
             
-            logger.info(f"Successfully processed {file.filename}: {len(limited_text.split())} words")
+            logger.info("Successfully processed %s: %d words", file.filename, word_count)
             return limited_text
             
         except HTTPException:
@@ -71,57 +148,269 @@ class ImageProcessor:
             logger.error(f"Error processing image {file.filename}: {e}")
             raise HTTPException(status_code=500, detail=f"Image processing failed: {str(e)}")
     
-    def _get_file_extension(self, filename: str) -> str:
-        """Extract file extension from filename"""
-        return filename.lower().split('.')[-1] if '.' in filename else ''
+    def _detect_format(self, header: bytes) -> Optional[str]:
+        """Identify the image format from its leading bytes"""
+        for signature, image_format in IMAGE_SIGNATURES:
+            if header.startswith(signature):
+                return image_format
+        if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+            return 'webp'
+        return None
+    
+    async def _extract_text_from_image(self, upload: BinaryIO, image_format: str) -> str:
+        """Extract text from image using OCR and AI vision, reusing results for identical uploads"""
+        content_hash = await asyncio.to_thread(self._hash_upload, upload)
+        text = self._text_cache.get(content_hash)
+        if text is None:
+            text = await self._extract_text_uncached(upload, image_format)
+            # Empty results may come from a transient vision failure, so they are not kept
+            if text and text.strip():
+                self._text_cache[content_hash] = text
+        return text
     
-    async def _extract_text_from_image(self, image_content: bytes) -> str:
+    def _hash_upload(self, upload: BinaryIO) -> bytes:
+        """Hash the upload's content in chunks; only used as a local cache key"""
+        digest = hashlib.blake2b(digest_size=16)
+        upload.seek(0)
+        for chunk in iter(lambda: upload.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        upload.seek(0)
+        return digest.digest()
+    
+    async def _extract_text_uncached(self, upload: BinaryIO, image_format: str) -> str:
         """Extract text from image using OCR and AI vision"""
         try:
-            # First try OCR
-            ocr_text = self._extract_text_ocr(image_content)
+            # First try OCR. Each worker thread keeps its own loaded tesserocr API, so uploads run in
+            # parallel; only the Tesseract CLI gains from batching uploads that arrive together.
+            job = (upload, image_format)
+            if PyTessBaseAPI is not None:
+                ocr_result = (await self._ocr_batch([job]))[0]
+            else:
+                ocr_result = await self._ocr_queue.add_request(job)
+            if ocr_result is None:
+                # Looked like an image but doesn't decode; the vision model couldn't read it either
+                raise HTTPException(status_code=400, detail="Could not read image: the file is damaged or not a valid image")
+            if isinstance(ocr_result, Exception):
+                raise ocr_result
+            ocr_text, needs_vision, vision_content, vision_format = ocr_result
             
-            # If OCR fails or returns minimal text, try AI vision
-            if not ocr_text or len(ocr_text.strip()) < 10:
-                logger.info("OCR returned minimal text, trying AI vision")
-                ai_text = await self._extract_text_ai_vision(image_content)
+            # If OCR looks unreliable on an image that seems to hold text, try AI vision
+            if needs_vision:
+                logger.info("OCR result unreliable, trying AI vision")
+                if vision_content is None:
+                    # Not re-encoded during decode, so send the original bytes
+                    vision_content = await asyncio.to_thread(self._read_upload, upload)
+                ai_text = await self._extract_text_ai_vision(vision_content, vision_format)
                 
-                if ai_text and len(ai_text.strip()) > len(ocr_text.strip()):
+                if ai_text and ai_text.strip():
                     return ai_text
             
             return ocr_text
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Text extraction error: {e}")
             raise Exception(f"Failed to extract text from image: {str(e)}")
     
-    def _extract_text_ocr(self, image_content: bytes) -> str:
-        """Extract text using OCR (Tesseract)"""
+    def _get_tess_api(self):
+        """Get this thread's Tesseract API handle, or None to use pytesseract"""
+        if PyTessBaseAPI is None:
+            return None
+        api = getattr(self._tess_local, "api", None)
+        if api is None and not getattr(self._tess_local, "failed", False):
+            try:
+                api = PyTessBaseAPI(lang="eng", psm=PSM.AUTO)
+                self._tess_local.api = api
+            except RuntimeError as e:
+                logger.error(f"Tesseract API initialization error: {e}")
+                self._tess_local.failed = True
+        return api
+    
+    def _read_upload(self, upload: BinaryIO) -> bytes:
+        """Read the whole spooled upload"""
+        upload.seek(0)
+        return upload.read()
+    
+    async def _ocr_batch(self, jobs):
+        """OCR a batch of (upload, format) jobs; decoding and Tesseract are CPU-bound, so keep them off the event loop"""
+        async with self._ocr_semaphore:
+            return await asyncio.to_thread(self._run_ocr_batch, jobs)
+    
+    def _run_ocr_batch(self, jobs):
+        """
+        Decode each image once and OCR the batch
+        
+        Returns:
+            Per job: (text, whether to try AI vision, bytes for the vision call or None to send
+            the upload as is, format for the vision call), None if the image could not be decoded,
+            or the exception that stopped its review; one bad image never fails the rest of the batch
+        """
+        results = [None] * len(jobs)
+        loaded = []
+        for index, (upload, image_format) in enumerate(jobs):
+            try:
+                loaded.append((index, *self._load_image(upload, image_format)))
+            except Exception as e:
+                logger.error(f"Image decode error: {e}")
+        
         try:
-            # Open image
-            image = Image.open(io.BytesIO(image_content))
-            
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Extract text using Tesseract
-            text = pytesseract.image_to_string(image)
+            ocr_results = self._extract_text_ocr_batch([image for _, image, _, _ in loaded])
+            for (index, image, image_content, image_format), (text, confidence) in zip(loaded, ocr_results):
+                try:
+                    results[index] = self._review_ocr(image, text, confidence, image_content, image_format)
+                except Exception as e:
+                    logger.error(f"OCR review error: {e}")
+                    results[index] = e
+        finally:
+            # Release Pillow's pixel storage as soon as both paths are done with it. Image.close()
+            # would also close the upload the image was read from, which the vision fallback may still send.
+            loaded.clear()
+        return results
+    
+    def _review_ocr(self, image: Image.Image, text: str, confidence: float,
+                    image_content: Optional[bytes], image_format: str):
+        """Decide whether OCR needs the vision fallback, and prepare what that call would send"""
+        if len(text) >= MIN_OCR_CHARS:
+            needs_vision = confidence < MIN_OCR_CONFIDENCE
+        else:
+            # Little or no text: worth a vision call only if the image has text-like structure at all
+            needs_vision = self._has_edges(image)
+        
+        if needs_vision and image_content is None and image_format in VISION_TRANSCODE_FORMATS:
+            # Re-encode from the decoded image now rather than decoding the upload again later
+            image_content = self._encode_png(image)
+            image_format = 'png'
+        return text, needs_vision, image_content, image_format
+    
+    def _has_edges(self, image: Image.Image) -> bool:
+        """Cheap edge-density check that tells photos of text from blank or flat images"""
+        preview = image.convert('L')
+        preview.thumbnail(EDGE_PREVIEW_SIZE)
+        # Nothing is left inside the border of a strip this thin, and it can't hold legible text anyway
+        if preview.width <= 2 or preview.height <= 2:
+            return False
+        edges = preview.filter(ImageFilter.FIND_EDGES)
+        # The filter marks the one-pixel border as edges, so leave it out
+        edges = edges.crop((1, 1, edges.width - 1, edges.height - 1))
+        return ImageStat.Stat(edges).mean[0] >= TEXT_EDGE_THRESHOLD
+    
+    def _load_image(self, upload: BinaryIO, image_format: str):
+        """
+        Decode an upload, shrinking oversized images
+        
+        Returns:
+            (image, re-encoded bytes or None if the original is kept, format of those bytes)
+        """
+        image_content = None
+        image = Image.open(upload)
+        # draft() may already shrink the image, so decide on downscaling from the stored size
+        downscale = max(image.size) > MAX_IMAGE_EDGE
+        # Let JPEG decode straight at a reduced scale when the image is far too large
+        image.draft('RGB', (MAX_IMAGE_EDGE, MAX_IMAGE_EDGE))
+        image.load()
+        
+        # Tesseract works on grayscale anyway, so keep 1-bit, grayscale and RGB scans as they are
+        # and reduce anything else (palette, alpha, CMYK, 16-bit) to a single channel
+        if image.mode not in OCR_IMAGE_MODES or (downscale and image.mode == '1'):
+            # 1-bit images can only be resized with nearest-neighbour, which drops thin strokes.
+            # Rebinding frees the original's pixels without closing the upload behind it.
+            image = image.convert('L')
+        
+        if downscale:
+            image.thumbnail((MAX_IMAGE_EDGE, MAX_IMAGE_EDGE), Image.LANCZOS)
+            # Upload the smaller version too instead of the original bytes
+            with io.BytesIO() as buffer:
+                image.save(buffer, format='JPEG', quality=DOWNSCALED_JPEG_QUALITY)
+                image_content = buffer.getvalue()
+            image_format = 'jpeg'
+        
+        return image, image_content, image_format
+    
+    def _extract_text_ocr(self, image: Image.Image):
+        """Extract text using OCR (Tesseract); returns (text, mean word confidence 0-100)"""
+        try:
+            # Extract text using Tesseract, reusing the loaded API instead of spawning a process
+            api = self._get_tess_api()
+            if api is not None:
+                api.SetImage(image)
+                text = api.GetUTF8Text()
+                return text.strip(), api.MeanTextConf()
             
-            return text.strip()
+            data = pytesseract.image_to_data(image, output_type=Output.DICT)
+            return self._parse_ocr_data(data).get(1, ("", 0.0))
             
         except Exception as e:
             logger.error(f"OCR error: {e}")
-            return ""
+            return "", 0.0
     
-    async def _extract_text_ai_vision(self, image_content: bytes) -> str:
+    def _extract_text_ocr_batch(self, images):
+        """OCR several images; with the Tesseract CLI, one process handles the whole batch"""
+        if len(images) <= 1 or self._get_tess_api() is not None:
+            return [self._extract_text_ocr(image) for image in images]
+        
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                # Uncompressed BMP is the cheapest format to hand over; the list file holds one path per line
+                paths = []
+                for number, image in enumerate(images):
+                    path = os.path.join(tmp_dir, f"{number}.bmp")
+                    image.save(path, format='BMP')
+                    paths.append(path)
+                list_path = os.path.join(tmp_dir, "images.txt")
+                with open(list_path, "w") as list_file:
+                    list_file.write("\n".join(paths) + "\n")
+                
+                data = pytesseract.image_to_data(list_path, output_type=Output.DICT)
+            
+            pages = self._parse_ocr_data(data)
+            return [pages.get(number, ("", 0.0)) for number in range(1, len(images) + 1)]
+        except Exception as e:
+            logger.error(f"Batch OCR error: {e}")
+            return [self._extract_text_ocr(image) for image in images]
+    
+    def _parse_ocr_data(self, data):
+        """Group image_to_data output into {page_num: (text, mean word confidence 0-100)}"""
+        # Rebuild the lines from the word boxes, and average the confidence of recognized words
+        pages = {}
+        for page_num, block_num, par_num, line_num, word, conf in zip(
+            data['page_num'], data['block_num'], data['par_num'], data['line_num'], data['text'], data['conf']
+        ):
+            lines, confidences = pages.setdefault(page_num, ({}, []))
+            if word.strip():
+                lines.setdefault((block_num, par_num, line_num), []).append(word)
+            conf = float(conf)
+            if conf > 0:
+                confidences.append(conf)
+        
+        return {
+            page_num: (
+                '\n'.join(' '.join(words) for words in lines.values()).strip(),
+                sum(confidences) / len(confidences) if confidences else 0.0
+            ) for page_num, (lines, confidences) in pages.items()
+        }
+    
+    def _encode_png(self, image: Image.Image) -> bytes:
+        """Encode a decoded image as PNG"""
+        with io.BytesIO() as buffer:
+            image.save(buffer, format='PNG', optimize=False)
+            return buffer.getvalue()
+    
+    async def _extract_text_ai_vision(self, image_content: bytes, image_format: str) -> str:
         """Extract text using AI vision (OpenAI GPT-4 Vision)"""
         try:
-            client = get_client()
+            client = get_async_client().with_options(max_retries=VISION_MAX_RETRIES)
             
-            # Convert image to base64
-            import base64
-            image_base64 = base64.b64encode(image_content).decode('utf-8')
+            # Convert image to a base64 data URL; the encoding is pure ASCII, so skip UTF-8 validation
+            if len(image_content) > INLINE_ENCODE_LIMIT:
+                image_base64 = await asyncio.to_thread(base64.b64encode, image_content)
+            else:
+                image_base64 = base64.b64encode(image_content)
+            # Rebinding drops the encoded bytes as soon as the string exists
+            image_base64 = image_base64.decode('ascii')
+            # Declare the real type so the provider doesn't have to sniff and re-decode it
+            image_url = f"data:image/{image_format};base64," + image_base64
+            del image_base64
             
             # Create vision prompt
             messages = [
@@ -135,23 +424,41 @@ class ImageProcessor:
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{image_base64}"
+                                "url": image_url
                             }
                         }
                     ]
                 }
             ]
             
-            # Call AI vision API
-            response = client.chat.completions.create(
+            # Call AI vision API; retry backoff sleeps without blocking the event loop.
+            # Streamed so generation can be cut off once it passes the word limit.
+            stream = await client.chat.completions.create(
                 model="gpt-4o-mini",  # Use vision-capable model
                 messages=messages,
-                max_tokens=1000,
-                temperature=0.1
+                max_tokens=VISION_MAX_TOKENS,
+                temperature=0.1,
+                stream=True
             )
             
-            text = response.choices[0].message.content
-            return text.strip() if text else ""
+            parts = []
+            word_count = 0
+            ends_in_word = False
+            async with stream:
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    parts.append(delta)
+                    word_count += len(delta.split())
+                    if ends_in_word and not delta[0].isspace():
+                        word_count -= 1  # a word continued from the previous chunk
+                    ends_in_word = not delta[-1].isspace()
+                    # The rest would be cut by _limit_words anyway; leaving closes the stream
+                    if word_count > self.max_words:
+                        break
+            
+            return "".join(parts).strip()
             
         except Exception as e:
             logger.error(f"AI vision error: {e}")
@@ -162,25 +469,18 @@ class ImageProcessor:
         if not text:
             return ""
         
-        # Remove excessive whitespace
-        lines = text.split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            # Remove excessive spaces
-            cleaned_line = ' '.join(line.split())
-            if cleaned_line:
-                cleaned_lines.append(cleaned_line)
-        
-        return '\n'.join(cleaned_lines)
+        # Collapse spaces within lines, then drop blank lines and line padding
+        text = _INLINE_WS_RE.sub(' ', text)
+        return _LINE_BREAK_RE.sub('\n', text).strip()
     
-    def _limit_words(self, text: str, max_words: int = 500) -> str:
-        """Limit text to maximum number of words"""
-        words = text.split()
+    def _limit_words(self, text: str, max_words: int = 500) -> Tuple[str, int]:
+        """Limit text to maximum number of words; returns (text, word count)"""
+        # Split at most max_words times; anything past the limit stays in one trailing chunk
+        words = text.split(None, max_words)
         
         if len(words) <= max_words:
-            return text
+            return text, len(words)
         
         # Truncate to max_words and add ellipsis
         limited_words = words[:max_words]
-        return ' '.join(limited_words) + "..."
+        return ' '.join(limited_words) + "...", max_words
@@ -2,6 +2,8 @@
 Legal AI System Prompt - Complete Implementation
 """
 
+import string
+
 LEGAL_AI_SYSTEM_PROMPT = """
 You are a Legal AI Assistant designed to provide structured legal information and general conversational responses.
 
@@ -194,4 +196,12 @@ REMEMBER:
 - Use "Information not available - consult a qualified attorney" when you lack specific information
 - Use empty strings "" when field is not applicable
 - Never omit fields entirely from the structure
-"""
\ No newline at end of file
+"""
+
+# Parsed once at import. Values are substituted for $placeholders; the prompt has none today,
+# so it renders unchanged and stays a byte-identical prefix that providers can cache.
+_PROMPT_TEMPLATE = string.Template(LEGAL_AI_SYSTEM_PROMPT)
+
+def render_system_prompt(**values) -> str:
+    """Render the system prompt with the given placeholder values"""
+    return _PROMPT_TEMPLATE.substitute(values)